@@ -1,6 +1,5 @@
 import pandas as pd
-import re
-from openpyxl import load_workbook
+from sheet_reader import read_sheet
 
 ###############################################################################
 # USER PARAMETERS
@@ -9,48 +8,32 @@ filename = "federitiva.xlsx"  # single-sheet Excel with 2 header rows & bold log
 output_filename = "federitiva_reformatted.xlsx"
 
 ###############################################################################
-# STEP 1) EXTRACT BOLD FORMATTING WITH OPENPYXL
-#          FOR THE "CATEGORY" COLUMN, FROM ROW 3 ONWARD.
+# STEP 1) READ THE SHEET ONCE (see sheet_reader.py):
+#          - df is the same DataFrame pd.read_excel(filename, header=[0,1]) gives
+#          - first_col has the value and bold flag of the "Category" cell of
+#            every data row (row 3 onward)
 ###############################################################################
-wb = load_workbook(filename, data_only=True)
-ws = wb.active  # there's only one sheet
+df, first_col = read_sheet(filename)
 
 rows_list = []
 last_level0 = None
-for row_cells in ws.iter_rows(min_row=3, max_col=1):
-    cell = row_cells[0]
-    cat_text = str(cell.value).strip() if cell.value else ""
-    is_bold = cell.font.bold if cell.font else False
+for excel_row, (value, is_bold) in enumerate(first_col, start=3):
+    cat_text = str(value).strip() if value else ""
     level = 0 if is_bold else 1
     if level == 0:
         last_level0 = cat_text
     rows_list.append({
-        "excel_row": cell.row,
+        "excel_row": excel_row,
         "category": cat_text,
         "level": level,
         "parent_text": last_level0
     })
 
 print("Openpyxl extracted bold info for", len(rows_list), "rows (starting from row 3).")
+print("Built", len(df), "data rows in total.")
 
 ###############################################################################
-# STEP 2) READ THE FILE WITH PANDAS, SPECIFYING TWO HEADER ROWS.
-#         DO NOT skip data rows, because row1/row2 are official headers.
-###############################################################################
-df = pd.read_excel(filename, header=[0,1])
-df.reset_index(drop=True, inplace=True)
-
-print("pandas read", len(df), "data rows in total.")
-
-# If mismatch, trim
-min_len = min(len(df), len(rows_list))
-if len(df) != len(rows_list):
-    print(f"Warning: Different row counts: pandas={len(df)}, openpyxl={len(rows_list)}. Trunc to {min_len}.")
-df = df.iloc[:min_len].copy()
-rows_list = rows_list[:min_len]
-
-###############################################################################
-# STEP 3) FLATTEN THE MULTIINDEX COLUMNS
+# STEP 2) FLATTEN THE MULTIINDEX COLUMNS
 ###############################################################################
 def flatten_col(col_pair):
     """
@@ -62,7 +45,7 @@ def flatten_col(col_pair):
     s = str(col_pair[1]).strip() if len(col_pair) > 1 else ""
 
     # check if second part has 'total'
-    if re.search(r'(?i)total', s):
+    if "total" in s.lower():
         return f"FDI_{y}"
     # try season as integer
     try:
@@ -87,42 +70,45 @@ for i, cpair in enumerate(orig_cols):
 df.columns = new_cols
 
 ###############################################################################
-# STEP 4) BUILD 'Country'/'State' ARRAYS FROM rows_list
+# STEP 3) BUILD 'Country'/'State' ARRAYS FROM rows_list
 #         IF level=0 => 'Country'=row_text, 'State'=''
 #         IF level=1 => 'Country'=parent_text, 'State'=row_text
 #         If they're the same => 'State'=''
 ###############################################################################
-countries = []
-states = []
+country_txt = []
+state_txt = []
 for rd in rows_list:
     if rd["level"] == 0:
-        ctry = rd["category"]
-        st = ""
+        country_txt.append(rd["category"])
+        state_txt.append("")
     else:
-        ctry = rd["parent_text"] or ""
-        st = rd["category"] or ""
-    # if same => set st=''
-    if ctry == st:
-        st = ""
-    countries.append(ctry)
-    states.append(st)
+        country_txt.append(rd["parent_text"] or "")
+        state_txt.append(rd["category"] or "")
+
+# Dictionary-encode both columns over one shared set of names, so the
+# "same name" test below compares integer codes instead of strings.
+names = pd.CategoricalDtype(pd.unique(pd.Series(country_txt + state_txt + [""])))
+countries = pd.Categorical(country_txt, dtype=names)
+states = pd.Categorical(state_txt, dtype=names)
+# if same => set st=''
+states[countries.codes == states.codes] = ""
 
 ###############################################################################
-# STEP 5) CREATE THE FINAL OUTPUT DF:
+# STEP 4) CREATE THE FINAL OUTPUT DF:
 #         1) 'Country'
 #         2) 'State'
 #         3) The numeric columns
 ###############################################################################
-df_final = pd.DataFrame()
-df_final["Country"] = countries
-df_final["State"]   = states
-
 # The first col in df was 'TO_DROP'
 df.drop(columns=["TO_DROP"], inplace=True, errors='ignore')
-df_final = pd.concat([df_final, df], axis=1)
+# The parser hands back one block per column; copy() consolidates them so the
+# two inserts below don't work on (and warn about) a fragmented frame.
+df_final = df.copy()
+df_final.insert(0, "State", states)
+df_final.insert(0, "Country", countries)
 
 ###############################################################################
-# STEP 6) SAVE
+# STEP 5) SAVE
 ###############################################################################
-df_final.to_excel(output_filename, index=False)
+df_final.to_excel(output_filename, index=False, engine="xlsxwriter")
 print("Done. Final shape:", df_final.shape)
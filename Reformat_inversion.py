@@ -1,6 +1,7 @@
+import numpy as np
 import pandas as pd
 import re
-from openpyxl import load_workbook
+from sheet_reader import read_sheet
 
 ###############################################################################
 # USER PARAMETERS
@@ -15,52 +16,47 @@ output_filename = "inversion_reformatted.xlsx"
 # "Nuevas", "Reinvers", or "Cuentas", it's level=1 => one of the 3 known lines.
 # Otherwise, it's level=0 => treat as a country.
 ###############################################################################
-def is_level1_item(cat_text: str) -> bool:
-    """Return True if cat_text (uppercase) contains Nuestras/Reinvers/Cuentas."""
-    cat_up = cat_text.upper()
-    if "NUEVAS" in cat_up or "REINVERS" in cat_up or "CUENTAS" in cat_up:
-        return True
-    return False
+# We'll produce final columns => [ "Country", "N_...", "V_...", "C_..." ]
+prefix_map = {
+    "NUEVAS": "N_",           # lines containing "NUEVAS" => prefix "N_"
+    "REINVERS": "V_",         # lines containing "REINVERS" => "V_"
+    "CUENTAS": "C_"           # lines containing "CUENTAS" => "C_"
+}
+prefixes = list(prefix_map.values())
+_LEVEL1_RE = re.compile("|".join(prefix_map))
+
+def level1_prefix(cat_text: str):
+    """Return N_/V_/C_ if cat_text contains Nuevas/Reinvers/Cuentas, else None."""
+    m = _LEVEL1_RE.search(cat_text.upper())
+    return prefix_map[m.group(0)] if m else None
 
-wb = load_workbook(filename, data_only=True)
-ws = wb.active  # single sheet
+# One openpyxl pass gives both the DataFrame (same as pd.read_excel with
+# header=[0,1]) and the first-column text of every data row (see sheet_reader.py).
+df, first_col = read_sheet(filename)
 
 rows_list = []
-for row_cells in ws.iter_rows(min_row=3, max_col=1):
-    cell = row_cells[0]
-    text = str(cell.value).strip() if cell.value else ""
-    lvl = 1 if is_level1_item(text) else 0
+for excel_row, (first, _) in enumerate(first_col, start=3):
+    text = str(first).strip() if first else ""
+    prefix = level1_prefix(text)
+    lvl = 1 if prefix else 0
     rows_list.append({
-        "excel_row": cell.row,
+        "excel_row": excel_row,
         "category": text,
-        "level": lvl
+        "level": lvl,
+        "prefix": prefix
     })
 
 print(f"Openpyxl read {len(rows_list)} data rows from row 3 onward.")
 
 ###############################################################################
-# STEP B) Read data with pandas, 2 header rows => MultiIndex => flatten them
-###############################################################################
-df = pd.read_excel(filename, header=[0,1])
-df.reset_index(drop=True, inplace=True)
-print(f"Pandas read {len(df)} data rows total.")
-
-# If mismatch => trim the longer
-min_len = min(len(df), len(rows_list))
-if min_len < len(df):
-    df = df.iloc[:min_len].copy()
-if min_len < len(rows_list):
-    rows_list = rows_list[:min_len]
-
-###############################################################################
-# Flatten columns => e.g. (1999,'1') => '1999Q1', (1999,'Total') => '1999'
+# STEP B) Flatten columns => e.g. (1999,'1') => '1999Q1', (1999,'Total') => '1999'
 ###############################################################################
 def flatten_col(col_pair):
     # col_pair might be ('1999','1') => '1999Q1'
     # or ('1999','Total') => '1999'
     year_str = str(col_pair[0]).strip()
     season_str = str(col_pair[1]).strip() if len(col_pair)>1 else ""
-    if re.search(r'(?i)total', season_str):
+    if "total" in season_str.lower():
         return year_str
     try:
         s_int = int(float(season_str))
@@ -80,79 +76,41 @@ df.columns = new_cols
 df.drop(columns=["TO_DROP"], inplace=True, errors="ignore")
 
 ###############################################################################
-# STEP C) Group data by scanning rows_list:
-#   When we see a level=0 => new country block.
-#   Then subsequent level=1 => gather data lines (N_/V_/C_), until next level=0 or end.
+# STEP C) Group data by country block:
+#   Every level=0 row starts a new country block (block_id = running count).
+#   Each level=1 line is copied as a whole numpy row into its block's
+#   N_/V_/C_ slot of one preallocated (blocks x 3 x columns) array.
 ###############################################################################
-# We'll produce final columns => [ "Country", "N_...", "V_...", "C_..." ]
-prefix_map = {
-    "NUEVAS": "N_",           # lines containing "NUEVAS" => prefix "N_"
-    "REINVERS": "V_",         # lines containing "REINVERS" => "V_"
-    "CUENTAS": "C_"           # lines containing "CUENTAS" => "C_"
-}
-
-final_records = []
-nrows = len(df)
-i = 0
-while i < nrows:
-    # We expect rows_list[i] => level=0 => new country
-    if rows_list[i]["level"] != 0:
+# Flattened names can repeat (e.g. (1999,'2') and (1999,'2.1') both give
+# '1999Q2'); like the per-name dicts this replaced, each name is kept once, at
+# its first position, holding the values of its last column.
+last_col = {coln: j for j, coln in enumerate(df.columns)}
+value_cols = list(last_col)
+levels = np.array([r["level"] for r in rows_list])
+block_id = np.cumsum(levels == 0) - 1
+
+country_names = [r["category"] for r in rows_list if r["level"] == 0]
+M = df.to_numpy()[:, list(last_col.values())]
+out = np.full((len(country_names), len(prefixes), len(value_cols)), None, dtype=object)
+for i in np.flatnonzero(levels == 1):
+    if block_id[i] < 0:
         # skip lines that are level1 if we haven't found a new country yet
         print(f"Row {i} is level=1 => not a new country => skip 1 row.")
-        i+=1
         continue
+    out[block_id[i], prefixes.index(rows_list[i]["prefix"])] = M[i]
 
-    country_name = rows_list[i]["category"]
-    # We'll gather numeric data from subsequent level=1 lines in a block_data
-    block_data = {
-        "N_": {},
-        "V_": {},
-        "C_": {}
-    }
-
-    # Move to next row
-    i+=1
-    # while i<nrows and row is level1 => gather
-    while i<nrows and rows_list[i]["level"] == 1:
-        cat_up = rows_list[i]["category"].upper()
-        # find prefix
-        chosen_prefix = None
-        for kw, pref in prefix_map.items():
-            if kw in cat_up:
-                chosen_prefix = pref
-                break
-        if not chosen_prefix:
-            print(f"Warning: row {i} has unknown level1 item => {cat_up} => ignoring.")
-            i+=1
-            continue
-        # gather numeric data from df row i => store in block_data[chosen_prefix]
-        row_dict = df.iloc[i].to_dict()
-        for coln, val in row_dict.items():
-            block_data[chosen_prefix][coln] = val
-        # next row
-        i+=1
-
-    # Now we've consumed all level1 lines for this country, or we hit next level0 or end
-    # Build final wide record => "Country", plus N_..., V_..., C_...
-    rec = {}
-    rec["Country"] = country_name
-    allcols = df.columns
-    for coln in allcols:
-        rec[f"N_{coln}"] = block_data["N_"].get(coln, None)
-        rec[f"V_{coln}"] = block_data["V_"].get(coln, None)
-        rec[f"C_{coln}"] = block_data["C_"].get(coln, None)
-
-    final_records.append(rec)
+# (block, prefix, column) => one row per block, columns ordered
+# N_col, V_col, C_col for each original column
+wide = pd.DataFrame(
+    out.transpose(0, 2, 1).reshape(len(country_names), -1),
+    columns=[f"{pfx}{coln}" for coln in value_cols for pfx in prefixes]
+)
 
 ###############################################################################
-# STEP D) Build final DataFrame
+# STEP D) Build final DataFrame => "Country" first
 ###############################################################################
-df_final = pd.DataFrame(final_records)
-# reorder => "Country" first
-cols = df_final.columns.tolist()
-cols.remove("Country")
-cols = ["Country"] + cols
-df_final = df_final[cols]
+wide.insert(0, "Country", pd.Categorical(country_names))
+df_final = wide
 
 ###############################################################################
 # STEP E) Save
@@ -177,5 +135,5 @@ new_cols = [remove_unnamed_substring(c) for c in df_final.columns]
 df_final.columns = new_cols
 
 
-df_final.to_excel(output_filename, index=False)
+df_final.to_excel(output_filename, index=False, engine="xlsxwriter")
 print("Done. Final shape:", df_final.shape)
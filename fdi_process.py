@@ -1,316 +1,300 @@
+import numpy as np
 import pandas as pd
-import re
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from hierarchy import build_hierarchy
 
-###############################################################################
-# STEP 1: READ THE EXCEL FILE & RESET THE INDEX
-###############################################################################
-df = pd.read_excel(
-    "FDI.xlsx",                 # <-- update with your file path
-    sheet_name="Por sector",    # <-- update sheet name if needed
-    header=[0, 1]               # two header rows
-)
-df.reset_index(drop=True, inplace=True)
+def sum_of_children_pass(V, missing, offs, child_idx, visit):
+    """
+    Bottom-up over the rows in `visit` (ascending): fill every missing cell
+    whose children are all known with their sum.
+    Returns the filled positions as (rows, cols) arrays.
+    """
+    filled_rows, filled_cols = [], []
+    for i in visit[::-1]:
+        child_idxs = child_idx[offs[i]:offs[i + 1]]
+        cols = np.flatnonzero(missing[i] & ~missing[child_idxs].any(axis=0))
+        if not len(cols):
+            continue
+        V[i, cols] = V[child_idxs][:, cols].sum(axis=0)
+        missing[i, cols] = False
+        filled_rows.append(np.full(len(cols), i))
+        filled_cols.append(cols)
+    if not filled_rows:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return np.concatenate(filled_rows), np.concatenate(filled_cols)
 
-###############################################################################
-# STEP 2: FLATTEN THE TWO-ROW HEADERS INTO A SINGLE ROW OF COLUMN NAMES
-###############################################################################
-temp_cols = []
-for col_pair in df.columns:
-    col_str = "_".join(str(x) for x in col_pair if x)
-    temp_cols.append(col_str)
-df.columns = temp_cols
+def parent_minus_siblings_pass(V, missing, offs, child_idx, visit):
+    """
+    Top-down over the parent rows in `visit` (ascending): where a known parent
+    has exactly one missing child, fill it with parent minus its siblings.
+    Returns the filled positions as (rows, cols, parents) arrays.
+    """
+    filled_rows, filled_cols, filled_parents = [], [], []
+    for parent_i in visit:
+        child_idxs = child_idx[offs[parent_i]:offs[parent_i + 1]]
+        child_missing = missing[child_idxs]
+        cols = np.flatnonzero(~missing[parent_i] & (child_missing.sum(axis=0) == 1))
+        if not len(cols):
+            continue
+        child_missing = child_missing[:, cols]
+        known_sum = np.where(child_missing, 0.0, V[child_idxs][:, cols]).sum(axis=0)
+        rows_hit = child_idxs[child_missing.argmax(axis=0)]
+        V[rows_hit, cols] = V[parent_i, cols] - known_sum
+        missing[rows_hit, cols] = False
+        filled_rows.append(rows_hit)
+        filled_cols.append(cols)
+        filled_parents.append(np.full(len(cols), parent_i))
+    if not filled_rows:
+        return (np.empty(0, dtype=np.intp),) * 3
+    return np.concatenate(filled_rows), np.concatenate(filled_cols), np.concatenate(filled_parents)
 
-###############################################################################
-# STEP 3: CLEAN UP "Unnamed:" COLUMNS & RENAME THE FIRST COLUMN TO "Category"
-###############################################################################
-new_cols = []
-for col in df.columns:
-    if "Unnamed:" in col:
-        parts = col.split("_")
-        parts = [p for p in parts if not p.startswith("Unnamed:")]
-        col = "_".join(parts)
-    new_cols.append(col)
-df.columns = new_cols
-
-if df.columns[0] != "Category":
-    df.rename(columns={df.columns[0]: "Category"}, inplace=True)
+def process_fdi(path="FDI.xlsx", log_entries=None):
+    """
+    Read the "Por sector" sheet, parse the Category hierarchy and fill the
+    missing / "C" cells (STEPS 1-10).
 
-###############################################################################
-# STEP 4: PARSE THE HIERARCHY FROM 'Category'
-#
-# (Same logic as before: TOTAl => -1, no digits => 0, special patterns => level 2, etc.)
-###############################################################################
-def parse_category(cat_str):
-    cat_str = cat_str.strip()
-    if cat_str.upper() == "TOTAL":
-        return -1, None, None
-    if not re.search(r'\d', cat_str):
-        return 0, None, None
-    m_hyphen = re.match(r'^(\d{2})\s*-\s*(\d{2})', cat_str)
-    if m_hyphen:
-        start = int(m_hyphen.group(1))
-        end = int(m_hyphen.group(2))
-        special_range = {f"{num:02d}" for num in range(start, end + 1)}
-        return 2, None, special_range
-    m_y = re.match(r'^(\d{2})\s*y\s*(\d{2})', cat_str, re.IGNORECASE)
-    if m_y:
-        special_range = {m_y.group(1), m_y.group(2)}
-        return 2, None, special_range
-
-    m_digits = re.match(r'^(\d+)', cat_str)
-    if m_digits:
-        digits = m_digits.group(1)
-        if len(digits) == 2:
-            return 2, digits, None
-        elif len(digits) == 3:
-            return 3, digits, None
-        elif len(digits) >= 4:
-            return 4, digits[:4], None
-
-    return 0, None, None
-
-last_seen = {}
-rows = []
-children_map = {}
-
-for i in range(len(df)):
-    raw_cat = df.at[i, "Category"]
-    cat_str = str(raw_cat)
-    level, code, special_range = parse_category(cat_str)
-    
-    row_dict = {
-        "index": i,
-        "name": cat_str.strip(),
-        "level": level,
-        "code": code,
-        "special_range": special_range,
-        "parent": None,
-        "values": {}
-    }
+    Returns (df, rows, children_map): df holds the filled values, rows is one
+    record per sheet row (name, level, code, parent; parent -1 = none).
+    If a list is passed as log_entries, one tuple per filled cell is appended:
+        (row, col position, method, parent row or -1, rows used, value)
+    With log_entries=None no log tuples are built at all.
+    """
+    keep_log = log_entries is not None
+
+    ###########################################################################
+    # STEP 1: READ THE EXCEL FILE (read_excel already returns a RangeIndex)
+    ###########################################################################
+    df = pd.read_excel(
+        path,                       # <-- update with your file path
+        sheet_name="Por sector",    # <-- update sheet name if needed
+        header=[0, 1],              # two header rows
+        na_values=["C"],            # "C" (confidential) cells are read as NaN
+        engine="calamine"           # Rust-backed reader (pip install python-calamine)
+    )
+
+    ###########################################################################
+    # STEP 2: FLATTEN THE TWO-ROW HEADERS INTO A SINGLE ROW OF COLUMN NAMES
+    ###########################################################################
+    temp_cols = []
+    for col_pair in df.columns:
+        col_str = "_".join(str(x) for x in col_pair if x)
+        temp_cols.append(col_str)
+    df.columns = temp_cols
+
+    ###########################################################################
+    # STEP 3: CLEAN UP "Unnamed:" COLUMNS & RENAME THE FIRST COLUMN TO "Category"
+    ###########################################################################
+    new_cols = []
     for col in df.columns:
-        if col == "Category":
-            continue
-        row_dict["values"][col] = df.at[i, col]
-    rows.append(row_dict)
-    
-    if level == -1:
-        last_seen[-1] = i
-    elif level == 0:
-        if -1 in last_seen:
-            row_dict["parent"] = last_seen[-1]
-            children_map.setdefault(last_seen[-1], []).append(i)
-        last_seen[0] = i
-    elif level == 2:
-        if 0 in last_seen:
-            row_dict["parent"] = last_seen[0]
-            children_map.setdefault(last_seen[0], []).append(i)
-        last_seen[2] = i
-    elif level == 3:
-        if 2 in last_seen:
-            candidate = rows[last_seen[2]]
-            if candidate.get("special_range"):
-                if code and code[:2] in candidate["special_range"]:
-                    row_dict["parent"] = last_seen[2]
-                    children_map.setdefault(last_seen[2], []).append(i)
-            else:
-                parent_code = candidate.get("code")
-                if parent_code and code and code.startswith(parent_code):
-                    row_dict["parent"] = last_seen[2]
-                    children_map.setdefault(last_seen[2], []).append(i)
-        last_seen[3] = i
-    elif level == 4:
-        if 3 in last_seen:
-            candidate = rows[last_seen[3]]
-            parent_code = candidate.get("code")
-            if parent_code and code and code.startswith(parent_code):
-                row_dict["parent"] = last_seen[3]
-                children_map.setdefault(last_seen[3], []).append(i)
-        last_seen[4] = i
-
-value_cols = [c for c in df.columns if c != "Category"]
-
-missing_initial = 0
-total_fillable_cells = 0
-for i in range(len(df)):
-    for col in value_cols:
-        val = df.at[i, col]
-        if (isinstance(val, str) and val.strip().upper() == "C") or pd.isna(val):
-            missing_initial += 1
-        total_fillable_cells += 1
-print(f"Initially, {missing_initial} missing cells out of {total_fillable_cells} total fillable cells.")
-
-iteration_count = 0
-max_iterations = 50
-cells_filled_so_far = 0
-log_entries = []
-
-def get_row_name(idx):
-    return rows[idx]["name"]
-
-while True:
-    iteration_count += 1
-    changed_any = False
-    row_map = {rd["index"]: rd for rd in rows}
-    for rd in rows:
-        i = rd["index"]
-        parent_i = rd["parent"]
-        child_idxs = children_map.get(i, [])
-        for col in value_cols:
-            val = rd["values"][col]
-            if (isinstance(val, str) and val.strip().upper() == "C") or pd.isna(val):
-                missing = True
-            else:
-                missing = False
-            if not missing:
-                continue
-
-            # CASE A: sum of children
-            if child_idxs:
-                all_children_known = True
-                child_sum = 0
-                child_cells_used = []
-                for cidx in child_idxs:
-                    cval = row_map[cidx]["values"][col]
-                    if (isinstance(cval, str) and cval.strip().upper() == "C") or pd.isna(cval):
-                        all_children_known = False
-                        break
-                    child_sum += cval
-                    child_cells_used.append(f"(row={cidx}, col={col}, val={cval})")
-                if all_children_known:
-                    rd["values"][col] = child_sum
-                    changed_any = True
-                    cells_filled_so_far += 1
-                    log_entries.append({
-                        "filled_row_index": i,
-                        "filled_row_name": get_row_name(i),
-                        "filled_col_name": col,
-                        "method": "sum_of_children",
-                        "cells_used": "; ".join(child_cells_used),
-                        "computed_value": child_sum
-                    })
-                    continue
-
-            # CASE B: parent minus siblings
-            if parent_i is not None:
-                parent_val = row_map[parent_i]["values"][col]
-                if not ((isinstance(parent_val, str) and parent_val.strip().upper() == "C") or pd.isna(parent_val)):
-                    sibling_idxs = [s for s in children_map[parent_i] if s != i]
-                    siblings_known = True
-                    sibling_sum = 0
-                    sibling_cells_used = []
-                    for sidx in sibling_idxs:
-                        sval = row_map[sidx]["values"][col]
-                        if (isinstance(sval, str) and sval.strip().upper() == "C") or pd.isna(sval):
-                            siblings_known = False
-                            break
-                        sibling_sum += sval
-                        sibling_cells_used.append(f"(row={sidx}, col={col}, val={sval})")
-                    if siblings_known:
-                        result_val = parent_val - sibling_sum
-                        rd["values"][col] = result_val
-                        changed_any = True
-                        cells_filled_so_far += 1
-                        log_entries.append({
-                            "filled_row_index": i,
-                            "filled_row_name": get_row_name(i),
-                            "filled_col_name": col,
-                            "method": "parent_minus_siblings",
-                            "parent_cell_used": f"(row={parent_i}, col={col}, val={parent_val})",
-                            "cells_used": "; ".join(child_cells_used),
-                            "computed_value": result_val
-                        })
-                        continue
-    if not changed_any or iteration_count >= max_iterations:
-        break
+        if "Unnamed:" in col:
+            parts = col.split("_")
+            parts = [p for p in parts if not p.startswith("Unnamed:")]
+            col = "_".join(parts)
+        new_cols.append(col)
+    df.columns = new_cols
 
-###############################################################################
-# INSERT A SMALL LOOP: Force any level 0 row that has parent=None
-# to have the TOTAL row as parent, if a TOTAL row exists.
-###############################################################################
-total_idx = None
-for rd in rows:
-    if rd["level"] == -1:
-        total_idx = rd["index"]
-        break
-
-if total_idx is not None:
-    for rd in rows:
-        if rd["level"] == 0 and rd["parent"] is None:
-            rd["parent"] = total_idx
-            children_map.setdefault(total_idx, []).append(rd["index"])
+    if df.columns[0] != "Category":
+        df.rename(columns={df.columns[0]: "Category"}, inplace=True)
 
-###############################################################################
-# STEP 8: LEVEL-ORDER (TOP-DOWN) MEAN IMPUTATION FOR REMAINING MISSING CELLS
-#
-# same as your old approach that gave 4111 remain
-###############################################################################
-def impute_level(parent_level, child_level, col):
-    groups = {}
-    for r in rows:
-        if r["level"] == child_level and r["parent"] is not None:
-            p = r["parent"]
-            if rows[p]["level"] == parent_level:
-                groups.setdefault(p, []).append(r)
-    for parent_idx, children in groups.items():
-        parent_val = rows[parent_idx]["values"][col]
-        if (isinstance(parent_val, str) and parent_val.strip().upper() == "C") or pd.isna(parent_val):
-            continue
-        known_sum = 0
-        missing_children = []
-        for child in children:
-            val = child["values"][col]
-            if (isinstance(val, str) and val.strip().upper() == "C") or pd.isna(val):
-                missing_children.append(child)
-            else:
-                known_sum += val
-        if missing_children:
-            imputed_val = (parent_val - known_sum) / len(missing_children)
-            for child in missing_children:
-                child["values"][col] = imputed_val
-                log_entries.append({
-                    "filled_row_index": child["index"],
-                    "filled_row_name": child["name"],
-                    "filled_col_name": col,
-                    "method": f"level{child['level']}_mean_imputation",
-                    "parent_used": f"(row={parent_idx}, col={col}, val={parent_val})",
-                    "imputed_value": imputed_val
-                })
-
-levels_order = [-1,0, 2, 3, 4]
-for col in value_cols:
+    # All values go into one float64 matrix V (rows x value_cols), built once.
+    # "C" cells already arrive as NaN, so the value columns are plain floats and
+    # "missing" downstream is just the NaN mask. to_numeric only guards against
+    # any other stray text (coerced to NaN as well).
+    value_cols = [c for c in df.columns if c != "Category"]
+    V = df[value_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64, copy=True)
+    missing = np.isnan(V)
+
+    ###########################################################################
+    # STEP 4: PARSE THE HIERARCHY FROM 'Category'
+    ###########################################################################
+    # rows: name, level, code and parent per sheet row (see hierarchy.py).
+    # parent_arr is a writable copy of the parent column (-1 = no parent).
+    rows, children_map, parent_arr = build_hierarchy(df["Category"])
+    levels = rows["level"].to_numpy()
+
+    missing_initial = int(missing.sum())
+    total_fillable_cells = len(df) * len(value_cols)
+    print(f"Initially, {missing_initial} missing cells out of {total_fillable_cells} total fillable cells.")
+
+    ###########################################################################
+    # STEP 7: HIERARCHY FILL (ONE BOTTOM-UP PASS + ONE TOP-DOWN PASS)
+    #
+    # Works on the value matrix V and its "missing" mask (NaN, including former
+    # "C" cells). Each row is processed across all value columns at once.
+    #
+    # Every parent row comes before its children in the sheet, so walking the
+    # rows bottom-up visits children before parents (post-order) and walking
+    # them top-down visits parents before children (pre-order). A sum of
+    # children can only become known bottom-up, and a parent-minus-siblings
+    # fill only ever unlocks the filled row's own children, so the two passes
+    # fill the same cells as sweeping until nothing changes.
+    #
+    # The values can differ when the sheet's totals don't add up: here a cell
+    # that both rules could fill always gets sum of children (pass 1 runs
+    # first), while the old top-down sweep could reach it first through
+    # parent minus siblings. E.g. P=10 -> C1=?, C2=3; C1 -> D1=?, D2=2;
+    # D1 -> E1=4 gives C1=6 (4+2) here but C1=7 (10-3) with the old sweep.
+    ###########################################################################
+    # Hierarchy as flat arrays: parent_arr[i] is the parent row (-1 for none) and
+    # the children of p are child_idx[offs[p]:offs[p+1]] (CSR layout).
+    n = len(rows)
+    offs = np.zeros(n + 1, dtype=np.int32)
+    offs[1:] = np.cumsum(np.fromiter(map(len, children_map), dtype=np.int32, count=n))
+    child_idx = np.fromiter(itertools.chain.from_iterable(children_map), dtype=np.int32, count=offs[-1])
+
+    # Each pass only visits the rows it can change ("dirty" rows). A row's own
+    # cells are only filled while that row (pass 1) or its parent (pass 2) is
+    # visited, so the sets can be taken once before each pass.
+
+    # PASS 1 (bottom-up): sum of children, where every child is known.
+    # Dirty = rows that have children and are missing at least one cell.
+    dirty = missing.any(axis=1) & (offs[1:] > offs[:-1])
+    rows_a, cols_a = sum_of_children_pass(V, missing, offs, child_idx, np.flatnonzero(dirty))
+    if keep_log:
+        for i, j in zip(rows_a, cols_a):
+            log_entries.append((i, j, "sum_of_children", -1, child_idx[offs[i]:offs[i + 1]], V[i, j]))
+
+    # PASS 2 (top-down): parent minus siblings, where exactly one child is missing.
+    # Dirty = parents of rows still missing at least one cell (ascending order).
+    dirty = missing.any(axis=1) & (parent_arr >= 0)
+    rows_b, cols_b, parents_b = parent_minus_siblings_pass(V, missing, offs, child_idx, np.unique(parent_arr[dirty]))
+    if keep_log:
+        for i, j, parent_i in zip(rows_b, cols_b, parents_b):
+            siblings = child_idx[offs[parent_i]:offs[parent_i + 1]]
+            log_entries.append((i, j, "parent_minus_siblings", parent_i, siblings[siblings != i], V[i, j]))
+
+    cells_filled_so_far = len(rows_a) + len(rows_b)
+
+    ###########################################################################
+    # Force any level 0 row that has no parent (-1)
+    # to have the TOTAL row as parent, if a TOTAL row exists.
+    ###########################################################################
+    total_rows = np.flatnonzero(levels == -1)
+    if len(total_rows):
+        total_idx = total_rows[0]
+        orphans = np.flatnonzero((levels == 0) & (parent_arr < 0))
+        parent_arr[orphans] = total_idx
+        children_map[total_idx].extend(orphans.tolist())
+
+    ###########################################################################
+    # STEP 8: LEVEL-ORDER (TOP-DOWN) MEAN IMPUTATION FOR REMAINING MISSING CELLS
+    #
+    # same as your old approach that gave 4111 remain
+    #
+    # For each (parent level, child level) pair, the child rows are sorted by
+    # parent so each parent's children form one contiguous group; np.add.reduceat
+    # then gives every group's known sum and missing count for all columns at once.
+    ###########################################################################
+    def impute_level(parent_level, child_level):
+        is_child = (levels == child_level) & (parent_arr >= 0)
+        is_child[is_child] = levels[parent_arr[is_child]] == parent_level
+        children_rows = np.flatnonzero(is_child)
+        if not len(children_rows):
+            return
+        children_rows = children_rows[np.argsort(parent_arr[children_rows], kind="stable")]
+        parents = parent_arr[children_rows]
+        group_starts = np.flatnonzero(np.r_[True, parents[1:] != parents[:-1]])
+        group_parents = parents[group_starts]
+        group_of_child = np.repeat(np.arange(len(group_starts)), np.diff(np.r_[group_starts, len(children_rows)]))
+
+        child_missing = missing[children_rows]
+        known_sum = np.add.reduceat(np.where(child_missing, 0.0, V[children_rows]), group_starts, axis=0)
+        n_missing = np.add.reduceat(child_missing.astype(np.int32), group_starts, axis=0)
+        imputed = (V[group_parents] - known_sum) / np.maximum(n_missing, 1)
+
+        # only groups whose parent value is known get imputed
+        fill = child_missing & ~missing[group_parents][group_of_child]
+        r, cols = np.nonzero(fill)
+        rows_f = children_rows[r]
+        V[rows_f, cols] = imputed[group_of_child[r], cols]
+        missing[rows_f, cols] = False
+        if not keep_log:
+            return
+        method = f"level{child_level}_mean_imputation"
+        for i, j, parent_i in zip(rows_f, cols, parents[r]):
+            log_entries.append((i, j, method, parent_i, (), V[i, j]))
+
+    levels_order = [-1,0, 2, 3, 4]
     for idx in range(len(levels_order)-1):
         parent_level = levels_order[idx]
         child_level = levels_order[idx+1]
-        impute_level(parent_level, child_level, col)
+        impute_level(parent_level, child_level)
 
-###############################################################################
-# STEP 9: WRITE THE FILLED VALUES BACK INTO THE ORIGINAL DataFrame
-###############################################################################
-for rd in rows:
-    i = rd["index"]
-    for col in value_cols:
-        df.at[i, col] = rd["values"][col]
+    ###########################################################################
+    # STEP 9: WRITE THE FILLED VALUES BACK INTO THE ORIGINAL DataFrame
+    #
+    # V replaces the raw value columns as one float64 block.
+    ###########################################################################
+    df = pd.concat([df[["Category"]], pd.DataFrame(V, columns=value_cols, index=df.index)], axis=1)
 
-###############################################################################
-# STEP 10: COUNT REMAINING MISSING CELLS
-###############################################################################
-missing_final = 0
-for i in range(len(df)):
-    for col in value_cols:
-        val = df.at[i, col]
-        if (isinstance(val, str) and val.strip().upper() == "C") or pd.isna(val):
-            missing_final += 1
-
-print(f"\nAfter {iteration_count} iteration(s) of hierarchy fill,")
-print(f"Cells filled by hierarchy rules: {cells_filled_so_far}")
-print(f"Remaining missing cells BEFORE top-down imputation: {missing_initial - cells_filled_so_far}")
-print(f"Remaining missing cells AFTER top-down imputation: {missing_final}")
+    ###########################################################################
+    # STEP 10: COUNT REMAINING MISSING CELLS
+    ###########################################################################
+    missing_final = int(missing.sum())
+
+    print("\nAfter the bottom-up and top-down hierarchy fill passes,")
+    print(f"Cells filled by hierarchy rules: {cells_filled_so_far}")
+    print(f"Remaining missing cells BEFORE top-down imputation: {missing_initial - cells_filled_so_far}")
+    print(f"Remaining missing cells AFTER top-down imputation: {missing_final}")
+
+    rows["parent"] = parent_arr  # includes the level 0 rows moved under TOTAL
+    return df, rows, children_map
 
 ###############################################################################
 # STEP 11: SAVE THE FINAL DATA AND THE LOG
+#
+# The fill log is kept as tuples by process_fdi; the readable records are only
+# built here. The two workbooks don't depend on each other, so they are written
+# on two threads; the data file starts writing while the log records are built.
 ###############################################################################
-df.to_excel("FDI_data_filled.xlsx", index=True)
-log_df = pd.DataFrame(log_entries)
-log_df.to_excel("fdi_fill_log.xlsx", index=False)
+def build_log_df(df, rows, log_entries):
+    value_cols = [c for c in df.columns if c != "Category"]
+    V = df[value_cols].to_numpy()
+    names = rows["name"].to_numpy()
+
+    def cells_used_str(idxs, j):
+        col = value_cols[j]
+        return "; ".join(f"(row={k}, col={col}, val={V[k, j]})" for k in idxs)
+
+    def log_record(entry):
+        # Cells used by a fill are known before it and never overwritten, so
+        # formatting them from the final V shows the values the fill saw.
+        i, j, method, parent_i, used_idxs, value = entry
+        col = value_cols[j]
+        record = {
+            "filled_row_index": i,
+            "filled_row_name": names[i],
+            "filled_col_name": col,
+            "method": method
+        }
+        if method == "sum_of_children":
+            record["cells_used"] = cells_used_str(used_idxs, j)
+            record["computed_value"] = value
+        elif method == "parent_minus_siblings":
+            record["parent_cell_used"] = f"(row={parent_i}, col={col}, val={V[parent_i, j]})"
+            record["cells_used"] = cells_used_str(used_idxs, j)
+            record["computed_value"] = value
+        else:
+            record["parent_used"] = f"(row={parent_i}, col={col}, val={V[parent_i, j]})"
+            record["imputed_value"] = value
+        return record
+
+    return pd.DataFrame(
+        [log_record(e) for e in log_entries],
+        columns=["filled_row_index", "filled_row_name", "filled_col_name", "method",
+                 "parent_cell_used", "cells_used", "computed_value", "parent_used", "imputed_value"]
+    )
+
+if __name__ == "__main__":
+    log_entries = []
+    df, rows, children_map = process_fdi("FDI.xlsx", log_entries)
+
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        data_written = ex.submit(df.to_excel, "FDI_data_filled.xlsx", index=True, engine="xlsxwriter")
+        log_df = build_log_df(df, rows, log_entries)
+        log_written = ex.submit(log_df.to_excel, "fdi_fill_log.xlsx", index=False, engine="xlsxwriter")
+        data_written.result()
+        log_written.result()
 
-print("\nDone. 'FDI_data_filled.xlsx' and 'fdi_fill_log.xlsx' have been written.")
+    print("\nDone. 'FDI_data_filled.xlsx' and 'fdi_fill_log.xlsx' have been written.")
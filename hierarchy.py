@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import re
+import functools
+
+###############################################################################
+# PARSE ONE 'Category' CELL: (level, code, special_range)
+#
+# (Same logic as before: TOTAl => -1, no digits => 0, special patterns => level 2, etc.)
+###############################################################################
+_HAS_DIGIT_RE = re.compile(r'\d')
+_HYPHEN_RE = re.compile(r'^(\d{2})\s*-\s*(\d{2})')              # e.g. "31-33"
+_Y_RE = re.compile(r'^(\d{2})\s*y\s*(\d{2})', re.IGNORECASE)     # e.g. "43 y 46"
+_DIGIT_PREFIX_RE = re.compile(r'\d+')  # leading code digits
+
+# Category strings repeat across country sections, so each distinct one is
+# parsed only once. special_range is a frozenset since results are shared.
+@functools.lru_cache(maxsize=None)
+def parse_category(cat_str):
+    cat_str = cat_str.strip()
+    # Fast path for plain codes ("11 ...", "311 ...", "3111 ..."): two leading
+    # digits not followed by "-" / "y" can't be a special range, so the code
+    # length settles it without running the regexes below.
+    head = cat_str[:2]
+    if len(head) == 2 and head.isdecimal():
+        if cat_str[2:3].isdecimal():
+            if cat_str[3:4].isdecimal():
+                return 4, cat_str[:4], None
+            return 3, cat_str[:3], None
+        if cat_str[2:].lstrip()[:1] not in ("-", "y", "Y"):
+            return 2, head, None
+    if cat_str.upper() == "TOTAL":
+        return -1, None, None
+    if not _HAS_DIGIT_RE.search(cat_str):
+        return 0, None, None
+    m_hyphen = _HYPHEN_RE.match(cat_str)
+    if m_hyphen:
+        start = int(m_hyphen.group(1))
+        end = int(m_hyphen.group(2))
+        special_range = frozenset(f"{num:02d}" for num in range(start, end + 1))
+        return 2, None, special_range
+    m_y = _Y_RE.match(cat_str)
+    if m_y:
+        special_range = frozenset((m_y.group(1), m_y.group(2)))
+        return 2, None, special_range
+
+    m_digits = _DIGIT_PREFIX_RE.match(cat_str)
+    if m_digits:
+        n_digits = m_digits.end()
+        if n_digits == 2:
+            return 2, cat_str[:2], None
+        elif n_digits == 3:
+            return 3, cat_str[:3], None
+        elif n_digits >= 4:
+            return 4, cat_str[:4], None
+
+    return 0, None, None
+
+###############################################################################
+# BUILD THE HIERARCHY FOR A WHOLE 'Category' COLUMN
+###############################################################################
+def build_hierarchy(categories):
+    """
+    Link every row of the Category column to its parent row.
+
+    Returns (rows, children_map, parent_arr):
+      rows         - DataFrame with one record per row (name, level, code, parent)
+      children_map - children_map[p] = list of child rows of p
+      parent_arr   - writable int32 copy of rows["parent"] (-1 = no parent)
+    """
+    # The hierarchy is kept as one array per field (struct of arrays), one
+    # entry per sheet row: levels, parent_arr (-1 = no parent), codes, names.
+    n = len(categories)
+    levels = np.empty(n, dtype=np.int8)
+    parent_arr = np.full(n, -1, dtype=np.int32)
+    codes = np.empty(n, dtype=object)
+    names = np.empty(n, dtype=object)
+    # Two-digit code prefix per row (-1 = no code) and, for "31-33" / "43 y 46"
+    # rows, which prefixes they cover: special_table[row, prefix].
+    code_prefix = np.full(n, -1, dtype=np.int16)
+    is_range = np.zeros(n, dtype=bool)
+    special_table = np.zeros((n, 100), dtype=bool)
+    children_map = [[] for _ in range(n)]  # children_map[p] = child rows of p
+
+    # last_seen[level] = most recent row of that level (-1 = none yet); the
+    # TOTAL level -1 lands in the last slot through negative indexing.
+    last_seen = [-1] * 6
+    cat_arr = categories.map(str).to_numpy()  # str() of every cell, once
+
+    for i, cat_str in enumerate(cat_arr):
+        level, code, special_range = parse_category(cat_str)
+        levels[i] = level
+        codes[i] = code
+        names[i] = cat_str.strip()
+        if code:
+            code_prefix[i] = int(code[:2])
+        if special_range:
+            is_range[i] = True
+            special_table[i, [int(x) for x in special_range]] = True
+
+        parent = -1
+        if level == -1:
+            last_seen[-1] = i
+        elif level == 0:
+            parent = last_seen[-1]
+            last_seen[0] = i
+        elif level == 2:
+            parent = last_seen[0]
+            last_seen[2] = i
+        elif level == 3:
+            candidate = last_seen[2]
+            if candidate >= 0:
+                if is_range[candidate]:
+                    if code and special_table[candidate, code_prefix[i]]:
+                        parent = candidate
+                else:
+                    parent_code = codes[candidate]
+                    if parent_code and code and code.startswith(parent_code):
+                        parent = candidate
+            last_seen[3] = i
+        elif level == 4:
+            candidate = last_seen[3]
+            if candidate >= 0:
+                parent_code = codes[candidate]
+                if parent_code and code and code.startswith(parent_code):
+                    parent = candidate
+            last_seen[4] = i
+
+        if parent >= 0:
+            parent_arr[i] = parent
+            children_map[parent].append(i)
+
+    rows = pd.DataFrame({"name": names, "level": levels, "code": codes, "parent": parent_arr})
+    return rows, children_map, parent_arr.copy()
@@ -0,0 +1,83 @@
+import numpy as np
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+###############################################################################
+# READ A SHEET WITH TWO HEADER ROWS IN ONE OPENPYXL PASS
+#
+# Reformat_easy.py and Reformat_inversion.py need both the DataFrame that
+# pd.read_excel(filename, header=[0, 1]) gives and the first-column cells of
+# every data row (text and bold flag). Both come from the same streamed pass:
+# the rows are converted and trimmed the way pandas' openpyxl reader does it,
+# then handed to the same TextParser read_excel uses, so the column names
+# (forward-filled headers, "Unnamed: ..." blanks, ".1" duplicates), NA strings
+# and dtypes come out exactly as read_excel would produce them.
+###############################################################################
+def _convert_cell(cell):
+    # same conversion as pandas' openpyxl reader
+    if cell.value is None:
+        return ""
+    elif cell.data_type == TYPE_ERROR:
+        return np.nan
+    elif cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+def _fill_mi_header(row, control_row):
+    """
+    Forward-fill blank header cells, but only under the same parent header
+    (port of pandas' fill_mi_header).
+    """
+    last = row[0]
+    for i in range(1, len(row)):
+        if not control_row[i]:
+            last = row[i]
+        if row[i] == "" or row[i] is None:
+            row[i] = last
+        else:
+            control_row[i] = False
+            last = row[i]
+    return row, control_row
+
+def read_sheet(filename):
+    """
+    Stream the active sheet of `filename` once.
+
+    Returns (df, first_col): df matches pd.read_excel(filename, header=[0, 1]),
+    first_col holds (value, is_bold) of the first cell of every data row.
+    """
+    wb = load_workbook(filename, read_only=True, data_only=True, keep_links=False)
+    ws = wb.active
+    ws.reset_dimensions()  # ignore the stored <dimension>, like pandas does
+
+    data = []
+    first_col = []
+    last_row_with_data = -1
+    for row_cells in ws.rows:
+        row = [_convert_cell(c) for c in row_cells]
+        while row and row[-1] == "":
+            row.pop()  # trailing empty (e.g. only formatted) cells
+        if row:
+            last_row_with_data = len(data)
+        data.append(row)
+        cell = row_cells[0] if row_cells else None
+        font = cell.font if cell is not None else None
+        first_col.append((cell.value if cell is not None else None, bool(font.b) if font else False))
+    wb.close()
+
+    # trailing empty rows are dropped, shorter rows padded to the widest one
+    data = data[:last_row_with_data + 1]
+    first_col = first_col[2:last_row_with_data + 1]  # rows 1-2 are the headers
+    width = max(len(row) for row in data)
+    data = [row + [""] * (width - len(row)) for row in data]
+
+    control_row = [True] * width
+    for r in (0, 1):
+        data[r], control_row = _fill_mi_header(data[r], control_row)
+
+    df = TextParser(data, header=[0, 1], skip_blank_lines=False).read()
+    return df, first_col